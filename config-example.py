@@ -24,6 +24,10 @@ FLASK_HOST = "0.0.0.0"
 FLASK_PORT = 8765
 # 是否开启照片库 WebUI（前期检验提示词选片效果时使用，跑通后建议关闭）
 ENABLE_REVIEW_WEBUI = True
+# 前面有支持 X-Sendfile 的反向代理时开启，图片 / BIN 文件交给代理直接发送（直接运行 server.py 时保持 False）
+USE_X_SENDFILE = False
+# 前面是 NGINX 时可填一个 internal location 前缀（如 "/_inktime_output/"），ESP32 下载的 .bin 等输出文件交给 NGINX 发送（留空则由 Flask 发送）
+X_ACCEL_OUTPUT_PREFIX = ""
 
 # 离线中文城市名索引，使用 geonames 数据制作
 WORLD_CITIES_CSV = "./data/world_cities_zh.csv"
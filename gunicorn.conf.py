@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+生产环境用 gunicorn 启动 server.py（替代 Flask 自带的开发服务器）：
+
+    gunicorn -c gunicorn.conf.py server:app
+
+多进程 + 每进程多线程，ESP32 下载、WebUI 页面与图片请求可以并行处理。
+"""
+
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import config as cfg  # noqa: E402
+
+_host = str(getattr(cfg, "FLASK_HOST", "0.0.0.0") or "0.0.0.0")
+_port = int(getattr(cfg, "FLASK_PORT", 8765) or 8765)
+
+bind = f"{_host}:{_port}"
+workers = int(os.environ.get("INKTIME_WORKERS", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = 4
+
+# 在 master 里导入一次 server.py（建索引等启动工作只做一次），再 fork 出 worker
+preload_app = True
+
+accesslog = "-"
@@ -337,24 +337,23 @@ def wrap_text_chinese(draw: ImageDraw.ImageDraw,
                       max_lines: int) -> List[str]:
     """
     简单中文按字符宽度折行。
+    每行二分查找能放下的最长前缀，textlength 调用从每字一次降到每行 O(log n) 次。
     """
     if not text:
         return []
     lines: List[str] = []
-    line = ""
-    for ch in text:
-        test = line + ch
-        w = draw.textlength(test, font=font)
-        if w <= max_width:
-            line = test
-        else:
-            if line:
-                lines.append(line)
-            line = ch
-            if len(lines) >= max_lines:
-                break
-    if line and len(lines) < max_lines:
-        lines.append(line)
+    start = 0
+    while start < len(text) and len(lines) < max_lines:
+        # lo 个字符一定放得下（一个字也放不下时仍单独占一行）
+        lo, hi = 1, len(text) - start
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if draw.textlength(text[start:start + mid], font=font) <= max_width:
+                lo = mid
+            else:
+                hi = mid - 1
+        lines.append(text[start:start + lo])
+        start += lo
     return lines
 
 
@@ -470,69 +469,33 @@ def render_image(item: Dict[str, Any]) -> Image.Image:
 
     return canvas
 
-def apply_four_color_dither(img: Image.Image) -> Image.Image:
+def _make_palette_image() -> Image.Image:
+    """PIL quantize 用的调色板图：前 4 项为 PALETTE，其余 252 项填黑色（本就在调色板里，不会引入新颜色）。"""
+    flat = [c for rgb in PALETTE for c in rgb]
+    pal_img = Image.new("P", (1, 1))
+    pal_img.putpalette(flat + list(PALETTE[0]) * (256 - len(PALETTE)))
+    return pal_img
+
+
+_PALETTE_IMAGE = _make_palette_image()
+
+
+def quantize_four_color(img: Image.Image) -> Image.Image:
     """
     对图像做 Floyd–Steinberg 抖动，量化到四种颜色（黑/白/红/黄）。
+    由 Pillow 的 C 实现完成（quantize + FLOYDSTEINBERG），480x800 约 10ms；
+    逐像素的 Python 循环要 1 秒以上。返回 P 图像，调色板只保留 PALETTE 这 4 项
+    （quantize 遇到等距颜色取靠前的索引，填充用的黑色副本不会被选中）。
     """
     img = img.convert("RGB")
-    w, h = img.size
-    pixels = img.load()
-
-    err_r = [0.0] * w
-    err_g = [0.0] * w
-    err_b = [0.0] * w
-    next_err_r = [0.0] * w
-    next_err_g = [0.0] * w
-    next_err_b = [0.0] * w
-
-    for y in range(h):
-        for x in range(w):
-            r, g, b = pixels[x, y]
-            r = max(0.0, min(255.0, r + err_r[x]))
-            g = max(0.0, min(255.0, g + err_g[x]))
-            b = max(0.0, min(255.0, b + err_b[x]))
-
-            idx, pr, pg, pb = nearest_palette_color(r, g, b)
-
-            # 写回量化后的颜色
-            pixels[x, y] = (pr, pg, pb)
-
-            # 误差
-            er = r - pr
-            eg = g - pg
-            eb = b - pb
-
-            # Floyd–Steinberg:
-            #        *   7/16
-            #   3/16 5/16 1/16
-            if x + 1 < w:
-                err_r[x + 1] += er * (7.0 / 16.0)
-                err_g[x + 1] += eg * (7.0 / 16.0)
-                err_b[x + 1] += eb * (7.0 / 16.0)
-            if y + 1 < h:
-                if x > 0:
-                    next_err_r[x - 1] += er * (3.0 / 16.0)
-                    next_err_g[x - 1] += eg * (3.0 / 16.0)
-                    next_err_b[x - 1] += eb * (3.0 / 16.0)
-                next_err_r[x] += er * (5.0 / 16.0)
-                next_err_g[x] += eg * (5.0 / 16.0)
-                next_err_b[x] += eb * (5.0 / 16.0)
-                if x + 1 < w:
-                    next_err_r[x + 1] += er * (1.0 / 16.0)
-                    next_err_g[x + 1] += eg * (1.0 / 16.0)
-                    next_err_b[x + 1] += eb * (1.0 / 16.0)
-
-        if y + 1 < h:
-            # 把 next_err_* 移到当前行，并清零 next_err_*
-            for i in range(w):
-                err_r[i] = next_err_r[i]
-                err_g[i] = next_err_g[i]
-                err_b[i] = next_err_b[i]
-                next_err_r[i] = 0.0
-                next_err_g[i] = 0.0
-                next_err_b[i] = 0.0
-
-    return img
+    out = img.quantize(palette=_PALETTE_IMAGE, dither=Image.Dither.FLOYDSTEINBERG)
+    out.putpalette([c for rgb in PALETTE for c in rgb])
+    return out
+
+
+def apply_four_color_dither(img: Image.Image) -> Image.Image:
+    """同 quantize_four_color，返回 RGB 图像（供 image_to_palette_bin 按颜色查表）。"""
+    return quantize_four_color(img).convert("RGB")
 
 
 def image_to_palette_bin(img: Image.Image) -> bytes:
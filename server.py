@@ -4,13 +4,24 @@
 from __future__ import annotations
 
 from pathlib import Path
-from flask import Flask, abort, send_file, Response, request, redirect
+from flask import Flask, abort, send_from_directory, Response, request, redirect
 import mimetypes
+import os
+import random
+import re
 import sqlite3
-import json
-import html
+import gzip
+import hashlib
+import tempfile
+import threading
+import time
+import orjson
 import config as cfg
-from io import BytesIO
+from collections import defaultdict
+from functools import lru_cache
+from markupsafe import escape
+from typing import NamedTuple
+from urllib.parse import quote
 import render_daily_photo as rdp
 
 ROOT_DIR = Path(__file__).resolve().parent
@@ -39,14 +50,105 @@ FLASK_PORT = int(getattr(cfg, "FLASK_PORT", 8765) or 8765)
 # 是否开启照片库 WebUI（跑通后建议关闭，只保留 ESP32 下载接口）
 ENABLE_REVIEW_WEBUI = bool(getattr(cfg, "ENABLE_REVIEW_WEBUI", True))
 
+# 前面有支持 X-Sendfile 的反向代理（Apache mod_xsendfile / lighttpd）时开启：
+# 图片与 .bin 只回响应头，文件内容由代理用 sendfile(2) 发送，不占用 Python worker
+USE_X_SENDFILE = bool(getattr(cfg, "USE_X_SENDFILE", False))
+
+# 前面是 NGINX 时填一个 internal location 前缀（如 "/_inktime_output/"，alias 到 BIN_OUTPUT_DIR）：
+# .bin / 预览等输出文件只回 X-Accel-Redirect 响应头，由 NGINX 发送文件内容；留空则由 Flask 发送
+X_ACCEL_OUTPUT_PREFIX = str(getattr(cfg, "X_ACCEL_OUTPUT_PREFIX", "") or "").strip()
+if X_ACCEL_OUTPUT_PREFIX and not X_ACCEL_OUTPUT_PREFIX.endswith("/"):
+    X_ACCEL_OUTPUT_PREFIX += "/"
+
 DAILY_PHOTO_QUANTITY = int(getattr(cfg, "DAILY_PHOTO_QUANTITY", 5) or 5)
 if DAILY_PHOTO_QUANTITY < 1:
     DAILY_PHOTO_QUANTITY = 1
 
 # review 分页：每页 100 张
 REVIEW_PAGE_SIZE = 100
+# 浏览器缓存时长（秒）：相册照片按路径不变，长期缓存；输出目录里的 .bin / 预览每天会被覆盖，只短暂缓存
+IMAGE_CACHE_MAX_AGE = 31536000
+OUTPUT_CACHE_MAX_AGE = 60
+
+# 渲染好的 review 页最多缓存多少份（每份约 100KB）
+REVIEW_HTML_CACHE_SIZE = 32
+# 全表照片总数缓存多少秒：SQLite 没有行数元数据，COUNT 每次都要扫一遍索引
+PHOTO_COUNT_CACHE_SECONDS = 60
+
+# review 排序方式 -> ORDER BY（两种排序各有一条表达式索引，见 _ensure_indexes）
+REVIEW_ORDER_BY = {
+    "memory": "COALESCE(memory_score, -1) DESC, COALESCE(beauty_score, -1) DESC, path",
+    "beauty": "COALESCE(beauty_score, -1) DESC, COALESCE(memory_score, -1) DESC, path",
+}
+
+# 拍摄月日 "MM-DD"（EXIF datetime 形如 "2018:03:18 10:00:00"），review 按月日筛选用，配有表达式索引
+EXIF_MD_SQL = "replace(substr(json_extract(exif_json, '$.datetime'), 6, 5), ':', '-')"
+
+# 页面用到的 EXIF 字段：由 SQLite 的 json_extract 在查询里直接取出，Python 侧不再 json.loads
+EXIF_KEYS = ("datetime", "make", "model", "iso", "exposure_time", "f_number", "focal_length", "gps_lat", "gps_lon")
+EXIF_SELECT_SQL = ",\n".join(f"json_extract(exif_json, '$.{k}') AS j_{k}" for k in EXIF_KEYS)
+
+# EXIF datetime 里的日期部分，冒号或短横线分隔
+_EXIF_DATE_RE = re.compile(r"(\d{4})[:-](\d{2})[:-](\d{2})")
+
+# 大于这个字节数的 HTML / JSON 响应在浏览器支持时 gzip 压缩（/sim 内联了整库数据，可达数 MB）
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 4
+GZIP_MIMETYPES = ("text/html", "application/json")
+
+# /sim_render 渲染结果的磁盘缓存：目录、总大小上限；渲染逻辑变了就改版本号让旧缓存失效
+SIM_CACHE_DIR = BIN_OUTPUT_DIR / "sim_cache"
+SIM_CACHE_MAX_BYTES = 500 * 1024 * 1024
+SIM_CACHE_VERSION = "v3"
+
+
+def _sim_render_fingerprint() -> str:
+    """
+    渲染版本 + 字体（路径与 mtime）的指纹：换了字体，磁盘缓存和浏览器里带 ?v= 的旧图都要失效。
+    没配置字体时 FONT_PATH 指向项目目录，render_image 用的是 Pillow 默认字体，指纹取常量
+    （目录的 mtime 会随 photos.db 的 -wal/-shm 文件变化，不能参与指纹）。
+    """
+    if rdp.FONT_PATH.is_file():
+        font_key = f"{rdp.FONT_PATH}|{rdp.FONT_PATH.stat().st_mtime_ns}"
+    else:
+        font_key = "default"
+    return f"{SIM_CACHE_VERSION}.{hashlib.sha1(font_key.encode('utf-8')).hexdigest()[:8]}"
+
+
+SIM_RENDER_FINGERPRINT = _sim_render_fingerprint()
 
 app = Flask(__name__)
+app.config["USE_X_SENDFILE"] = USE_X_SENDFILE
+
+# review 页筛选下拉框的固定选项，启动时生成一次，供模板直接使用
+app.jinja_env.globals.update(
+    MONTH_OPTIONS=tuple((f"{i:02d}", f"{i} 月") for i in range(1, 13)),
+    DAY_OPTIONS=tuple((f"{i:02d}", f"{i} 日") for i in range(1, 32)),
+)
+
+
+@app.after_request
+def _gzip_response(resp: Response) -> Response:
+    """页面与接口的文本响应按 Accept-Encoding 做 gzip；文件（direct_passthrough）与流式响应原样返回。"""
+    if (resp.status_code != 200
+            or resp.mimetype not in GZIP_MIMETYPES
+            or resp.direct_passthrough
+            or resp.is_streamed
+            or "Content-Encoding" in resp.headers):
+        return resp
+
+    resp.vary.add("Accept-Encoding")
+    if request.accept_encodings["gzip"] <= 0:  # 未声明或 gzip;q=0 都视为不接受
+        return resp
+
+    data = resp.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return resp
+    resp.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    resp.headers["Content-Encoding"] = "gzip"
+    return resp
+
+
 def _require_webui_enabled() -> None:
     if not ENABLE_REVIEW_WEBUI:
         abort(404)
@@ -60,38 +162,131 @@ def _safe_join(base: Path, rel: str) -> Path:
     return p
 
 
-def _send_static_file(p: Path) -> Response:
-    if not p.exists() or not p.is_file():
+def _send_static_file(base: Path, rel: str, max_age: int | None = None, immutable: bool = False) -> Response:
+    """
+    发送 base 下的文件 rel，带 ETag / Last-Modified（支持 304）；max_age 为浏览器缓存秒数。
+    send_from_directory 自己会拒绝越出 base 的路径，文件不存在时返回 404。
+    """
+    mt = "application/octet-stream" if rel.lower().endswith(".bin") else None
+
+    resp = send_from_directory(base, rel, mimetype=mt, as_attachment=False, conditional=True, max_age=max_age)
+    if immutable:
+        resp.cache_control.immutable = True
+    return resp
+
+
+def _send_output_file(rel: str) -> Response:
+    """发送 BIN_OUTPUT_DIR 下的文件 rel；配置了 X_ACCEL_OUTPUT_PREFIX 时交给 NGINX 发送。"""
+    if not X_ACCEL_OUTPUT_PREFIX:
+        return _send_static_file(BIN_OUTPUT_DIR, rel, max_age=OUTPUT_CACHE_MAX_AGE)
+
+    try:
+        p = _safe_join(BIN_OUTPUT_DIR, rel)
+    except ValueError:
+        abort(404)
+    if not p.is_file():
         abort(404)
 
     if p.suffix.lower() == ".bin":
-        return send_file(p, mimetype="application/octet-stream", as_attachment=False)
+        mt = "application/octet-stream"
+    else:
+        mt = mimetypes.guess_type(p.name)[0] or "application/octet-stream"
+    resp = Response(mimetype=mt)
+    resp.headers["X-Accel-Redirect"] = X_ACCEL_OUTPUT_PREFIX + quote(rel.replace("\\", "/"))
+    resp.cache_control.public = True
+    resp.cache_control.max_age = OUTPUT_CACHE_MAX_AGE
+    return resp
+
 
-    mt, _ = mimetypes.guess_type(str(p))
-    if mt:
-        return send_file(p, mimetype=mt, as_attachment=False)
-    return send_file(p, as_attachment=False)
+# IMAGE_DIR 的路径前缀（配置原样 + resolve 后两种写法），启动时算一次，避免每行都 resolve()
+_IMAGE_DIR_PREFIXES = tuple(dict.fromkeys(
+    str(d).rstrip(os.sep) + os.sep for d in (IMAGE_DIR, IMAGE_DIR.resolve())
+))
 
 
+@lru_cache(maxsize=8192)
 def _make_image_url(path_str: str) -> str:
     """
     把数据库里的本地图片路径转换成 HTTP 可访问的 /images/... 路径。
     要求图片在 IMAGE_DIR 目录下；不在则返回空，避免 file:// 污染与 canvas 跨域。
+    纯字符串前缀匹配，不触发文件系统 stat。
     """
-    try:
-        p = Path(path_str).expanduser().resolve()
-        rel = p.relative_to(IMAGE_DIR.resolve())
-        return "/images/" + str(rel).replace("\\", "/")
-    except Exception:
-        return ""
+    for prefix in _IMAGE_DIR_PREFIXES:
+        if path_str.startswith(prefix):
+            return "/images/" + path_str[len(prefix):].replace("\\", "/")
+    return ""
 
 
 # --------------------------
 # DB helpers
 # --------------------------
 
-def load_rows(page: int = 1, page_size: int = REVIEW_PAGE_SIZE):
-    """分页读取 review 数据。返回 (rows, total_count)."""
+def _make_conn() -> sqlite3.Connection:
+    """
+    新建一条只读长连接（WebUI / ESP32 接口只查询不写库），PRAGMA 只在这里设置一次。
+    WAL 是库文件的持久属性，由启动时的 _ensure_indexes 用可写连接设置。
+    """
+    conn = sqlite3.connect(f"{DB_PATH.as_uri()}?mode=ro", uri=True, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row  # 行可按列名访问
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA mmap_size=268435456")  # 256MB
+    conn.execute("PRAGMA cache_size=-16000")  # 约 16MB
+    return conn
+
+
+def _ensure_indexes() -> None:
+    """
+    review 分页的排序 / 筛选索引：让 ORDER BY + LIMIT/OFFSET 走索引顺序扫描，按月日筛选走索引查找，
+    而不是每页全表排序。path 是主键，自带唯一索引，按 path 查询无需再建。
+    顺带把库切到 WAL：analyze / render 写库时不阻塞 WebUI 的读。
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_photo_scores_rank
+            ON photo_scores(COALESCE(memory_score, -1) DESC,
+                            COALESCE(beauty_score, -1) DESC,
+                            path)
+            """
+        )
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_photo_scores_beauty_rank
+            ON photo_scores(COALESCE(beauty_score, -1) DESC,
+                            COALESCE(memory_score, -1) DESC,
+                            path)
+            """
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_photo_scores_md ON photo_scores({EXIF_MD_SQL})")
+    except sqlite3.Error as e:
+        print(f"[InkTime] 创建索引失败（不影响使用）: {e}")
+    finally:
+        conn.close()
+
+
+if DB_PATH.exists():
+    _ensure_indexes()
+
+# 每个线程一条只读连接，首次使用时才打开；不在 import 时打开，
+# 否则 gunicorn preload_app 时连接会被 fork 进各个 worker（SQLite 连接不能跨进程共享）
+_DB_LOCAL = threading.local()
+
+
+def get_conn() -> sqlite3.Connection:
+    """当前线程的只读连接，没有就新建。"""
+    conn = getattr(_DB_LOCAL, "conn", None)
+    if conn is None:
+        conn = _DB_LOCAL.conn = _make_conn()
+    return conn
+
+
+def load_rows(page: int = 1, page_size: int = REVIEW_PAGE_SIZE, md: str = "", sort: str = "memory"):
+    """
+    分页读取 review 数据。返回 (rows, total_count).
+    md 为 "MM-DD" 时只取该月日的照片；sort 为 REVIEW_ORDER_BY 中的排序方式。
+    """
     if not DB_PATH.exists():
         raise SystemExit(f"找不到数据库文件: {DB_PATH}")
 
@@ -99,125 +294,224 @@ def load_rows(page: int = 1, page_size: int = REVIEW_PAGE_SIZE):
         page = 1
     if page_size < 1:
         page_size = REVIEW_PAGE_SIZE
+    order_by = REVIEW_ORDER_BY.get(sort, REVIEW_ORDER_BY["memory"])
 
     offset = (page - 1) * page_size
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    # 表名统一为 photo_scores（模型无关）
-    total_count = c.execute("SELECT COUNT(1) FROM photo_scores").fetchone()[0]
+    where_sql = f"WHERE {EXIF_MD_SQL} = ?" if md else ""
+    where_params = (md,) if md else ()
+    # 按月日筛选时总数走 idx_photo_scores_md，很便宜，用标量子查询随分页结果一起带回；
+    # 不筛选时用缓存的全表总数（count_photos），不必每页都扫全表
+    # （不用 COUNT(*) OVER ()：窗口函数会让排序绕开排序索引）
+    count_sql = f"(SELECT COUNT(1) FROM photo_scores {where_sql})" if md else "NULL"
 
-    base_sql = """
+    base_sql = f"""
         SELECT path,
                caption,
                type,
                memory_score,
                beauty_score,
                reason,
-               exif_json,
                width,
                height,
                orientation,
                used_at,
-               side_caption
+               side_caption,
+               {EXIF_SELECT_SQL},
+               {count_sql} AS total_count
         FROM photo_scores
-        ORDER BY COALESCE(memory_score, -1) DESC,
-                 COALESCE(beauty_score, -1) DESC,
-                 path
+        {where_sql}
+        ORDER BY {order_by}
         LIMIT ? OFFSET ?
     """
 
-    rows = c.execute(base_sql, (page_size, offset)).fetchall()
+    # 表名统一为 photo_scores（模型无关）
+    conn = get_conn()
+    rows = conn.execute(base_sql, (*where_params, *where_params, page_size, offset)).fetchall()
+
+    if not rows:
+        return [], 0
+    return rows, int(rows[0]["total_count"]) if md else count_photos()
+
 
-    conn.close()
-    return rows, int(total_count)
+@lru_cache(maxsize=1)
+def _count_photos(time_bucket: int) -> int:
+    """time_bucket 只参与缓存键：每 PHOTO_COUNT_CACHE_SECONDS 秒换一个，到期重新 COUNT。"""
+    conn = get_conn()
+    (n,) = conn.execute("SELECT COUNT(1) FROM photo_scores").fetchone()
+    return int(n)
 
 
-def load_sim_rows():
+def count_photos() -> int:
+    """photo_scores 总行数，最多滞后 PHOTO_COUNT_CACHE_SECONDS 秒。"""
     if not DB_PATH.exists():
-        raise SystemExit(f"找不到数据库文件: {DB_PATH}")
+        return 0
+    return _count_photos(int(time.time() // PHOTO_COUNT_CACHE_SECONDS))
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
 
-    rows = c.execute(
-        """
-        SELECT path,
-               caption,
-               type,
-               memory_score,
-               beauty_score,
-               reason,
-               side_caption,
-               exif_json,
-               width,
-               height,
-               orientation,
-               used_at,
-               exif_gps_lat,
-               exif_gps_lon,
-               exif_city
+def load_db_snapshot() -> tuple[int, int]:
+    """
+    (MAX(rowid), 行数)：数据库内容的廉价版本号，用作 review 页缓存的失效键。
+    analyze_photos.py 新增或重新分析（INSERT OR REPLACE 会分配新 rowid）会立刻让它变化；
+    删除照片则在行数缓存到期后体现（见 count_photos）。MAX(rowid) 是一次 B 树查找。
+    """
+    if not DB_PATH.exists():
+        return 0, 0
+
+    conn = get_conn()
+    (max_rowid,) = conn.execute("SELECT MAX(rowid) FROM photo_scores").fetchone()
+    return int(max_rowid or 0), count_photos()
+
+
+def load_md_counts() -> dict[str, int]:
+    """所有带拍摄日期的照片按月日计数：{"MM-DD": count}（只扫 idx_photo_scores_md）。"""
+    if not DB_PATH.exists():
+        return {}
+
+    conn = get_conn()
+    rows = conn.execute(
+        f"""
+        SELECT {EXIF_MD_SQL} AS md, COUNT(1)
         FROM photo_scores
+        WHERE md IS NOT NULL
+        GROUP BY md
         """
     ).fetchall()
 
-    conn.close()
-    return rows
+    return {md: int(cnt) for md, cnt in rows if rdp.md_to_day_of_year(md)}
+
+
+SIM_FETCH_BATCH = 256
 
-def get_photo_meta_by_path(abs_path: str):
+
+def iter_sim_rows():
+    """
+    逐批流式读取模拟器数据，避免把整张表一次性 fetchall 进内存。
+    只取挑选照片要用的轻量字段（路径 / 拍摄时间 / 回忆度 / rowid），其余字段由 /api/photo 按需读取。
+    没有拍摄日期、或不在 IMAGE_DIR 下（前端无法加载）的照片在 SQL 里就过滤掉。
+    """
+    if not DB_PATH.exists():
+        raise SystemExit(f"找不到数据库文件: {DB_PATH}")
+
+    prefix_sql = " OR ".join("substr(path, 1, ?) = ?" for _ in _IMAGE_DIR_PREFIXES)
+    prefix_params = [x for prefix in _IMAGE_DIR_PREFIXES for x in (len(prefix), prefix)]
+
+    conn = get_conn()
+    cur = conn.execute(
+        f"""
+        SELECT rowid,
+               path,
+               memory_score,
+               json_extract(exif_json, '$.datetime') AS j_datetime
+        FROM photo_scores
+        WHERE j_datetime IS NOT NULL
+          AND ({prefix_sql})
+        """,
+        prefix_params,
+    )
+    while True:
+        batch = cur.fetchmany(SIM_FETCH_BATCH)
+        if not batch:
+            break
+        yield from batch
+
+def get_photo_meta_by_path(db_paths: tuple[str, ...]):
     """
     从 DB 找到渲染需要的字段：date/side/lat/lon/city。
-    abs_path 必须是数据库里 photo_scores.path 的原值（通常是绝对路径）。
+    db_paths 为 photo_scores.path 可能的写法（见 _image_db_paths），命中任意一个即可。
     """
     if not DB_PATH.exists():
         return None
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    row = c.execute(
-        """
+    conn = get_conn()
+    row = conn.execute(
+        f"""
         SELECT path,
-               exif_json,
+               json_extract(exif_json, '$.datetime') AS j_datetime,
                side_caption,
                memory_score,
                exif_gps_lat,
                exif_gps_lon,
                exif_city
         FROM photo_scores
-        WHERE path = ?
+        WHERE path IN ({", ".join("?" * len(db_paths))})
         LIMIT 1
         """,
-        (abs_path,),
+        db_paths,
     ).fetchone()
-    conn.close()
 
     if not row:
         return None
 
-    path, exif_json, side_caption, memory_score, gps_lat, gps_lon, exif_city = row
-    date_str = extract_date_from_exif(exif_json)
+    date_str = extract_date_from_exif(row["j_datetime"])
     if not date_str:
         return None
 
+    memory_score = row["memory_score"]
     return {
-        "path": str(path),
+        "path": str(row["path"]),
         "date": date_str,
-        "side": side_caption or "",
+        "side": row["side_caption"] or "",
         "memory": float(memory_score) if memory_score is not None else None,
-        "lat": gps_lat,
-        "lon": gps_lon,
-        "city": exif_city or "",
+        "lat": row["exif_gps_lat"],
+        "lon": row["exif_gps_lon"],
+        "city": row["exif_city"] or "",
     }
 
-def summarize_exif(exif_json: str | None) -> str:
-    if not exif_json:
-        return ""
+def get_photo_detail_by_path(db_paths: tuple[str, ...]):
+    """模拟器详情面板的全部字段（/api/photo），db_paths 同 get_photo_meta_by_path。"""
+    if not DB_PATH.exists():
+        return None
 
-    try:
-        data = json.loads(exif_json)
-    except Exception:
-        return ""
+    conn = get_conn()
+    row = conn.execute(
+        f"""
+        SELECT caption,
+               type,
+               beauty_score,
+               reason,
+               side_caption,
+               exif_json,
+               width,
+               height,
+               orientation,
+               used_at,
+               exif_gps_lat,
+               exif_gps_lon,
+               exif_city,
+               {EXIF_SELECT_SQL}
+        FROM photo_scores
+        WHERE path IN ({", ".join("?" * len(db_paths))})
+        LIMIT 1
+        """,
+        db_paths,
+    ).fetchone()
+
+    if not row:
+        return None
+
+    exif_json = row["exif_json"]
+    beauty_score = row["beauty_score"]
+    width, height = row["width"], row["height"]
+    return {
+        "beauty": float(beauty_score) if beauty_score is not None else None,
+        "city": row["exif_city"] or "",
+        "lat": row["exif_gps_lat"],
+        "lon": row["exif_gps_lon"],
+        "side": row["side_caption"] or "",
+        "caption": row["caption"] or "",
+        "type": row["type"] or "",
+        "reason": row["reason"] or "",
+        "exif_json": exif_json or "",
+        "exif_summary": summarize_exif({k: row[f"j_{k}"] for k in EXIF_KEYS}) if exif_json else "",
+        "width": width if width is not None else "",
+        "height": height if height is not None else "",
+        "orientation": row["orientation"] or "",
+        "used_at": row["used_at"] or "",
+    }
+
+def summarize_exif(data: dict) -> str:
+    """data 为 EXIF_KEYS -> json_extract 取出的值。"""
 
     dtv = data.get("datetime")
     make = data.get("make")
@@ -256,587 +550,100 @@ def summarize_exif(exif_json: str | None) -> str:
     return "；".join(str(p) for p in parts if p)
 
 
-def extract_date_from_exif(exif_json: str | None) -> str:
-    if not exif_json:
-        return ""
-    try:
-        data = json.loads(exif_json)
-    except Exception:
-        return ""
-    dtv = data.get("datetime")
+def extract_date_from_exif(dtv) -> str:
+    """EXIF datetime（json_extract 取出的 $.datetime）-> "YYYY-MM-DD"。"""
     if not dtv:
         return ""
-    try:
-        date_part = str(dtv).split()[0]  # "2018:03:18"
-        parts = date_part.replace(":", "-").split("-")
-        if len(parts) >= 3:
-            return f"{parts[0]}-{parts[1]}-{parts[2]}"
-    except Exception:
-        return ""
-    return ""
+    m = _EXIF_DATE_RE.match(str(dtv))  # "2018:03:18 10:00:00" / "2018-03-18 ..."
+    return f"{m[1]}-{m[2]}-{m[3]}" if m else ""
 
 
 # --------------------------
 # HTML builders
 # --------------------------
 
-def build_html(rows, page: int, page_size: int, total_count: int):
-    items_html = []
-
-    for path, caption, ptype, m_score, b_score, reason, exif_json, width, height, orientation, used_at, side_caption in rows:
-        safe_caption = html.escape(caption or "").replace("\n", "<br>")
-        safe_side = html.escape(side_caption or "").replace("\n", "<br>")
-        safe_type = html.escape(ptype or "")
-        safe_reason = html.escape(reason or "")
-        exif_summary = summarize_exif(exif_json)
-        safe_exif = html.escape(exif_summary or "")
+class ReviewItem(NamedTuple):
+    """review 页一张卡片需要的字段（已整理好，转义交给模板 autoescape）。"""
+    path: str
+    img_uri: str
+    date: str
+    memory: float | None
+    beauty: float | None
+    ptype: str
+    reason: str
+    exif_summary: str
+    side: str
+    caption: str
+    res: str
+    orientation: str
+    used_at: str
+
+
+def build_html(rows, page: int, page_size: int, total_count: int,
+               month: str = "", day: str = "", sort: str = "memory", status: str = "") -> str:
+    """渲染 review 页，返回完整 HTML 字符串。"""
+    items = []
 
-        date_str = extract_date_from_exif(exif_json)
-        safe_date = html.escape(date_str or "")
+    for row in rows:
+        path = str(row["path"])
+        img_uri = _make_image_url(path)
+        if not img_uri:
+            continue
 
-        md_str = ""
-        if date_str and len(date_str) >= 10:
-            md_str = date_str[5:10]
-        safe_md = html.escape(md_str or "")
+        exif_data = {k: row[f"j_{k}"] for k in EXIF_KEYS}
+        date_str = extract_date_from_exif(exif_data["datetime"])
 
+        width, height = row["width"], row["height"]
         res_str = ""
         if width and height:
             try:
                 res_str = f"{int(width)} x {int(height)}"
             except Exception:
                 res_str = f"{width} x {height}"
-        orient_str = orientation or ""
-        used_str = used_at or ""
-
-        img_uri = _make_image_url(str(path))
-        if not img_uri:
-            continue
 
-        score_html = ""
-        if m_score is not None or b_score is not None:
-            parts = []
-            if m_score is not None:
-                parts.append(f"回忆度: {m_score:.1f}")
-            if b_score is not None:
-                parts.append(f"美观度: {b_score:.1f}")
-            score_line = " / ".join(parts)
-            score_html = f'<div class="score">{score_line}</div>'
-
-        type_html = f'<div class="type">类型: {safe_type}</div>' if safe_type else ""
-        exif_html = f'<div class="exif">{safe_exif}</div>' if safe_exif else ""
-        reason_html = f'<div class="reason">理由: {safe_reason}</div>' if safe_reason else ""
-
-        items_html.append(f"""
-        <div class="item"
-             data-date="{safe_date}"
-             data-md="{safe_md}"
-             data-memory="{m_score if m_score is not None else ''}"
-             data-beauty="{b_score if b_score is not None else ''}">
-            <div class="img-wrap">
-                <a class="img-link" href="/sim?img={html.escape(img_uri)}" title="打开该照片的模拟器">
-                    <img src="{img_uri}" loading="lazy">
-                </a>
-            </div>
-            {f'<div class="side-under">{safe_side}</div>' if safe_side else ''}
-            <div class="meta">
-                <div class="path">{html.escape(str(path))}</div>
-                {type_html}
-                {score_html}
-                {reason_html}
-                {exif_html}
-                <div class="extra">
-                    {f"拍摄日期: {safe_date}" if safe_date else ""}
-                    {(" · 分辨率: " + html.escape(res_str)) if res_str else ""}
-                    {(" · 方向: " + html.escape(orient_str)) if orient_str else ""}
-                    {(" · 已上屏: " + html.escape(used_str)) if used_str else ""}
-                </div>
-                <div class="caption">{safe_caption}</div>
-            </div>
-        </div>
-        """)
+        items.append(ReviewItem(
+            path=path,
+            img_uri=img_uri,
+            date=date_str,
+            memory=row["memory_score"],
+            beauty=row["beauty_score"],
+            ptype=row["type"] or "",
+            reason=row["reason"] or "",
+            exif_summary=summarize_exif(exif_data),
+            side=row["side_caption"] or "",
+            caption=row["caption"] or "",
+            res=res_str,
+            orientation=row["orientation"] or "",
+            used_at=row["used_at"] or "",
+        ))
 
-    items_str = "\n".join(items_html)
     total_pages = (total_count + page_size - 1) // page_size
 
-    html_str = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-  <meta charset="UTF-8">
-  <title>InkTime照片数据库</title>
-  <style>
-    :root{{
-      --bg: #0b0c10;
-      --panel: rgba(255,255,255,0.06);
-      --card: rgba(255,255,255,0.10);
-      --card2: rgba(255,255,255,0.08);
-      --text: rgba(255,255,255,0.92);
-      --muted: rgba(255,255,255,0.62);
-      --muted2: rgba(255,255,255,0.48);
-      --line: rgba(255,255,255,0.14);
-      --accent: #8ab4ff;
-      --accent2:#9cffd6;
-      --shadow: 0 18px 60px rgba(0,0,0,0.45);
-      --shadow2: 0 10px 28px rgba(0,0,0,0.35);
-      --radius: 14px;
-    }}
-    body{{
-      margin:0;
-      padding:0;
-      font-family: -apple-system, BlinkMacSystemFont, "SF Pro Text", system-ui, sans-serif;
-      background: radial-gradient(1200px 800px at 20% 0%, rgba(138,180,255,0.18), transparent 45%),
-                  radial-gradient(900px 700px at 90% 20%, rgba(156,255,214,0.14), transparent 55%),
-                  linear-gradient(180deg, #07080b 0%, #0b0c10 40%, #0b0c10 100%);
-      color: var(--text);
-    }}
-    .container{{
-      max-width: 1320px;
-      margin: 26px auto 60px;
-      padding: 0 18px;
-    }}
-    h1{{
-      font-size: 22px;
-      margin: 0 0 8px;
-      letter-spacing: 0.2px;
-    }}
-    .subtitle{{
-      font-size: 13px;
-      color: var(--muted);
-      margin: 0 0 14px;
-      line-height: 1.35;
-    }}
-
-    .controls{{
-      display:flex;
-      flex-wrap:wrap;
-      gap: 10px;
-      align-items:center;
-      margin: 12px 0 14px;
-      font-size: 13px;
-      background: var(--panel);
-      border: 1px solid var(--line);
-      border-radius: var(--radius);
-      padding: 10px 12px;
-      box-shadow: var(--shadow2);
-      backdrop-filter: blur(10px);
-    }}
-    .controls label{{
-      display:inline-flex;
-      align-items:center;
-      gap: 8px;
-      color: var(--muted);
-      white-space: nowrap;
-    }}
-    .controls select{{
-      padding: 7px 10px;
-      font-size: 13px;
-      color: var(--text);
-      background: rgba(255,255,255,0.08);
-      border: 1px solid rgba(255,255,255,0.16);
-      border-radius: 10px;
-      outline: none;
-    }}
-    .controls select:focus{{
-      border-color: rgba(138,180,255,0.7);
-      box-shadow: 0 0 0 3px rgba(138,180,255,0.16);
-    }}
-    .controls button{{
-      padding: 7px 12px;
-      font-size: 13px;
-      cursor: pointer;
-      color: var(--text);
-      background: rgba(255,255,255,0.10);
-      border: 1px solid rgba(255,255,255,0.16);
-      border-radius: 10px;
-      transition: transform .08s ease, background .15s ease, border-color .15s ease, opacity .15s ease;
-    }}
-    .controls button:hover{{
-      background: rgba(255,255,255,0.14);
-      border-color: rgba(255,255,255,0.26);
-    }}
-    .controls button:active{{
-      transform: translateY(1px);
-    }}
-    .controls button:disabled{{
-      opacity: 0.45;
-      cursor: not-allowed;
-    }}
-    .controls.pager{{
-      background: rgba(255,255,255,0.05);
-    }}
-
-    .status{{
-      font-size: 12px;
-      color: var(--muted);
-      margin: 8px 0 12px;
-    }}
-
-    .grid{{
-      display:grid;
-      grid-template-columns: repeat(auto-fill, minmax(300px, 1fr));
-      gap: 16px;
-    }}
-    .item{{
-      background: linear-gradient(180deg, var(--card) 0%, var(--card2) 100%);
-      border: 1px solid rgba(255,255,255,0.14);
-      border-radius: var(--radius);
-      overflow: hidden;
-      box-shadow: var(--shadow2);
-      display:flex;
-      flex-direction:column;
-      transition: transform .12s ease, border-color .15s ease, box-shadow .15s ease;
-    }}
-    .item:hover{{
-      transform: translateY(-2px);
-      border-color: rgba(138,180,255,0.38);
-      box-shadow: var(--shadow);
-    }}
-
-    .img-wrap{{
-      width:100%;
-      background: rgba(0,0,0,0.55);
-      display:flex;
-      align-items:center;
-      justify-content:center;
-      max-height: 260px;
-      overflow:hidden;
-    }}
-    .img-wrap img{{
-      width:100%;
-      height:auto;
-      display:block;
-      object-fit: cover;
-      filter: saturate(1.04) contrast(1.02);
-    }}
-    .img-link{{ display:block; width:100%; }}
-    .img-link:link, .img-link:visited{{ text-decoration:none; }}
-
-    .side-under{{
-      padding: 10px 12px 0;
-      font-size: 12px;
-      color: var(--text);
-      line-height: 1.45;
-      word-break: break-word;
-      opacity: 0.92;
-    }}
-
-    .meta{{
-      padding: 10px 12px 12px;
-      font-size: 13px;
-      color: var(--text);
-    }}
-    .path{{
-      font-size: 11px;
-      color: var(--muted2);
-      margin-bottom: 6px;
-      word-break: break-all;
-    }}
-    .type{{
-      font-size: 12px;
-      color: var(--muted);
-      margin-bottom: 4px;
-    }}
-    .score{{
-      font-size: 13px;
-      font-weight: 650;
-      margin-bottom: 6px;
-      color: var(--accent2);
-    }}
-    .reason{{
-      font-size: 12px;
-      color: var(--muted);
-      margin-bottom: 6px;
-      line-height: 1.45;
-    }}
-    .exif{{
-      font-size: 11px;
-      color: var(--muted2);
-      margin-bottom: 8px;
-      line-height: 1.45;
-    }}
-    .extra{{
-      font-size: 11px;
-      color: var(--muted2);
-      margin-bottom: 8px;
-      line-height: 1.45;
-    }}
-    .caption{{
-      margin-top: 6px;
-      font-size: 13px;
-      line-height: 1.55;
-      color: var(--text);
-    }}
-
-    @media (max-width: 560px){{
-      .container{{ padding: 0 14px; }}
-      .grid{{ grid-template-columns: 1fr; }}
-      .controls{{ gap: 8px; }}
-    }}
-  </style>
-</head>
-<body>
-  <div class="container">
-    <h1>InkTime照片数据库</h1>
-    <div class="subtitle">
-      数据库：{html.escape(str(DB_PATH))} · 当前页 {page} · 本页 {len(rows)} 张 · 总计 {total_count} 张（每页 {page_size} 张）
-    </div>
-
-    <div class="controls">
-      <label>
-        月份：
-        <select id="monthFilter">
-          <option value="">全部</option>
-          <option value="01">1 月</option><option value="02">2 月</option><option value="03">3 月</option>
-          <option value="04">4 月</option><option value="05">5 月</option><option value="06">6 月</option>
-          <option value="07">7 月</option><option value="08">8 月</option><option value="09">9 月</option>
-          <option value="10">10 月</option><option value="11">11 月</option><option value="12">12 月</option>
-        </select>
-      </label>
-      <label>
-        日期：
-        <select id="dayFilter">
-          <option value="">全部</option>
-          {''.join([f'<option value="{i:02d}">{i} 日</option>' for i in range(1, 32)])}
-        </select>
-      </label>
-      <label>
-        排序：
-        <select id="sortBy">
-          <option value="memory">按回忆度</option>
-          <option value="beauty">按美观度</option>
-        </select>
-      </label>
-      <button type="button" id="randomDateBtn">随机一天</button>
-    </div>
-
-    <div class="controls pager" style="justify-content: space-between;">
-      <div>
-        <button type="button" id="prevPageBtn">上一页</button>
-        <button type="button" id="nextPageBtn">下一页</button>
-      </div>
-      <div class="subtitle" style="margin:0;">第 <span id="pageNum">{page}</span> 页 / 共 <span id="pageTotal">{total_pages}</span> 页</div>
-    </div>
-
-    <div class="status" id="statusLine"></div>
-
-    <div class="grid">
-      {items_str}
-    </div>
-
-    <div class="controls pager" style="justify-content: space-between; margin-top: 18px;">
-      <div>
-        <button type="button" id="prevPageBtnBottom">上一页</button>
-        <button type="button" id="nextPageBtnBottom">下一页</button>
-      </div>
-      <div class="subtitle" style="margin:0;">第 <span>{page}</span> 页 / 共 <span>{total_pages}</span> 页</div>
-    </div>
-  </div>
-
-  <script>
-    document.addEventListener('DOMContentLoaded', function () {{
-      const monthSelect = document.getElementById('monthFilter');
-      const daySelect = document.getElementById('dayFilter');
-      const sortSelect = document.getElementById('sortBy');
-      const statusLine = document.getElementById('statusLine');
-      const randomBtn = document.getElementById('randomDateBtn');
-      const grid = document.querySelector('.grid');
-      const items = Array.from(grid.children);
-
-      function mdToDayOfYear(md) {{
-        const parts = md.split("-");
-        if (parts.length !== 2) return null;
-        const m = parseInt(parts[0], 10);
-        const d = parseInt(parts[1], 10);
-        if (!m || !d) return null;
-        const daysBefore = [0, 0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334];
-        if (m < 1 || m > 12) return null;
-        return daysBefore[m] + d;
-      }}
-
-      function applyFilterSort() {{
-        const mVal = monthSelect.value;
-        const dVal = daySelect.value;
-        const sortBy = sortSelect.value;
-
-        let filterMd = "";
-        if (mVal && dVal) filterMd = mVal + "-" + dVal;
-
-        let visibleItems = items.filter(function (item) {{
-          if (!filterMd) return true;
-          const mdAttr = item.getAttribute('data-md') || "";
-          return mdAttr === filterMd;
-        }});
-
-        items.forEach(function (it) {{ it.style.display = 'none'; }});
-
-        if (sortBy === 'memory' || sortBy === 'beauty') {{
-          const key = sortBy === 'memory' ? 'data-memory' : 'data-beauty';
-          visibleItems.sort(function (a, b) {{
-            const av = parseFloat(a.getAttribute(key) || '-1');
-            const bv = parseFloat(b.getAttribute(key) || '-1');
-            return bv - av;
-          }});
-        }}
-
-        visibleItems.forEach(function (it) {{
-          grid.appendChild(it);
-          it.style.display = '';
-        }});
-
-        if (!filterMd) {{ statusLine.textContent = ''; return; }}
-
-        if (visibleItems.length > 0) {{
-          statusLine.textContent = '找到 ' + visibleItems.length + ' 张 ' + parseInt(mVal, 10) + ' 月 ' + parseInt(dVal, 10) + ' 日 的照片（仅本页范围）。';
-        }} else {{
-          const targetDay = mdToDayOfYear(filterMd);
-          if (!targetDay) {{ statusLine.textContent = '日期格式无效。'; return; }}
-
-          let bestItem = null;
-          let bestDiff = Infinity;
-
-          items.forEach(function (item) {{
-            const mdAttr = item.getAttribute('data-md') || '';
-            const day = mdToDayOfYear(mdAttr);
-            if (!day) return;
-            const diff = Math.abs(day - targetDay);
-            if (diff < bestDiff) {{ bestDiff = diff; bestItem = item; }}
-          }});
-
-          if (!bestItem) {{ statusLine.textContent = '没有找到任何带日期的照片（仅本页范围）。'; return; }}
-
-          const closestDate = bestItem.getAttribute('data-date') || '';
-          let countSame = 0;
-          items.forEach(function (item) {{
-            if (item.getAttribute('data-date') === closestDate) countSame += 1;
-          }});
-
-          statusLine.textContent = '本页没有 ' + parseInt(mVal, 10) + ' 月 ' + parseInt(dVal, 10) +
-            ' 日 的照片。最近的是 ' + closestDate + '，本页共有 ' + countSame + ' 张。';
-        }}
-      }}
-
-      function pickRandomDate() {{
-        const allMd = items
-          .map(function (it) {{ return it.getAttribute('data-md') || ''; }})
-          .filter(function (md) {{ return md && md.length === 5 && md.indexOf('-') === 2; }});
-
-        const uniqueMd = Array.from(new Set(allMd));
-        if (uniqueMd.length === 0) {{
-          statusLine.textContent = '没有任何带日期的照片（仅本页范围），无法随机选择。';
-          return;
-        }}
-
-        const idx = Math.floor(Math.random() * uniqueMd.length);
-        const md = uniqueMd[idx];
-        const parts = md.split('-');
-        if (parts.length !== 2) {{ statusLine.textContent = '随机日期解析失败。'; return; }}
-
-        monthSelect.value = parts[0];
-        daySelect.value = parts[1];
-        applyFilterSort();
-        statusLine.textContent = '随机跳转到 ' + parseInt(parts[0], 10) + ' 月 ' + parseInt(parts[1], 10) + ' 日 的照片（仅本页范围）。';
-      }}
-
-      // 分页按钮
-      const currentPage = {page};
-      const totalPages = {total_pages};
-      const prevBtn = document.getElementById('prevPageBtn');
-      const nextBtn = document.getElementById('nextPageBtn');
-      const prevBtnBottom = document.getElementById('prevPageBtnBottom');
-      const nextBtnBottom = document.getElementById('nextPageBtnBottom');
-
-      function goPage(p) {{
-        const url = new URL(window.location.href);
-        url.searchParams.set('page', String(p));
-        window.location.href = url.toString();
-      }}
-
-      if (prevBtn) {{
-        prevBtn.disabled = currentPage <= 1;
-        prevBtn.addEventListener('click', () => goPage(Math.max(1, currentPage - 1)));
-      }}
-      if (nextBtn) {{
-        nextBtn.disabled = currentPage >= totalPages;
-        nextBtn.addEventListener('click', () => goPage(Math.min(totalPages, currentPage + 1)));
-      }}
-      if (prevBtnBottom) {{
-        prevBtnBottom.disabled = currentPage <= 1;
-        prevBtnBottom.addEventListener('click', () => goPage(Math.max(1, currentPage - 1)));
-      }}
-      if (nextBtnBottom) {{
-        nextBtnBottom.disabled = currentPage >= totalPages;
-        nextBtnBottom.addEventListener('click', () => goPage(Math.min(totalPages, currentPage + 1)));
-      }}
-
-      monthSelect.addEventListener('change', applyFilterSort);
-      daySelect.addEventListener('change', applyFilterSort);
-      sortSelect.addEventListener('change', applyFilterSort);
-      randomBtn.addEventListener('click', pickRandomDate);
-
-      applyFilterSort();
-    }});
-  </script>
-</body>
-</html>
-"""
-    return html_str
-
-
-def build_simulator_html(sim_rows, selected_img: str = ""):
-    items = []
-    for (
-        path,
-        caption,
-        ptype,
-        memory_score,
-        beauty_score,
-        reason,
-        side_caption,
-        exif_json,
-        width,
-        height,
-        orientation,
-        used_at,
-        gps_lat,
-        gps_lon,
-        exif_city,
-    ) in sim_rows:
-        date_str = extract_date_from_exif(exif_json)
-        if not date_str:
-            continue
-        img_uri = _make_image_url(str(path))
-        if not img_uri:
-            continue
-
-        items.append({
-            "path": img_uri,
-            "date": date_str,
-            "memory": float(memory_score) if memory_score is not None else None,
-            "beauty": float(beauty_score) if beauty_score is not None else None,
-            "city": exif_city or "",
-            "lat": gps_lat,
-            "lon": gps_lon,
-            "side": side_caption or "",
-            "caption": caption or "",
-            "type": ptype or "",
-            "reason": reason or "",
-            "exif_json": exif_json or "",
-            "exif_summary": summarize_exif(exif_json) if exif_json else "",
-            "width": width if width is not None else "",
-            "height": height if height is not None else "",
-            "orientation": orientation or "",
-            "used_at": used_at or "",
-        })
-
-    data_json = json.dumps(items, ensure_ascii=False).replace("</", "<\\/") if items else "[]"
-    selected_json = json.dumps(selected_img or "", ensure_ascii=False).replace("</", "<\\/")
-
-    html_str = f"""<!DOCTYPE html>
+    # 模板在 templates/ 下，由 Flask 的 Jinja2 环境编译一次后缓存，autoescape 负责转义
+    return app.jinja_env.get_template("review.html").render(
+        items=items,
+        db_path=str(DB_PATH),
+        page=page,
+        page_size=page_size,
+        row_count=len(rows),
+        total_count=total_count,
+        total_pages=total_pages,
+        month=month,
+        day=day,
+        sort=sort,
+        status=status,
+    )
+
+
+# 模拟器页面的固定部分（UTF-8 bytes）：启动时拼好一次，每次请求只把数据 JSON 拼在中间，
+# 不再对整页做 f-string 格式化（也就不用再把 CSS / JS 里的花括号写成 {{ }}）
+_SIM_HEAD = """<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
   <meta charset="UTF-8">
   <title>墨水屏模拟渲染图</title>
   <style>
-    :root {{
+    :root {
       --bg: #0b0c10;
       --panel: rgba(255,255,255,0.06);
       --line: rgba(255,255,255,0.14);
@@ -848,38 +655,38 @@ def build_simulator_html(sim_rows, selected_img: str = ""):
       --shadow: 0 18px 60px rgba(0,0,0,0.45);
       --shadow2: 0 10px 28px rgba(0,0,0,0.35);
       --radius: 14px;
-    }}
-    body {{
+    }
+    body {
       margin:0; padding:0;
       font-family:-apple-system,BlinkMacSystemFont,system-ui,sans-serif;
       background: radial-gradient(1200px 800px at 20% 0%, rgba(138,180,255,0.18), transparent 45%),
                   radial-gradient(900px 700px at 90% 20%, rgba(156,255,214,0.14), transparent 55%),
                   linear-gradient(180deg, #07080b 0%, #0b0c10 40%, #0b0c10 100%);
       color: var(--text);
-    }}
-    .container {{
+    }
+    .container {
       max-width: 1120px;
       margin: 22px auto 42px;
       padding: 0 16px;
-    }}
-    a.back {{
+    }
+    a.back {
       display:inline-block;
       margin-bottom: 10px;
       color: var(--accent);
       text-decoration: none;
-    }}
-    h1 {{
+    }
+    h1 {
       font-size: 22px;
       margin: 0 0 8px;
       letter-spacing: 0.2px;
-    }}
-    .subtitle {{
+    }
+    .subtitle {
       font-size: 13px;
       color: var(--muted);
       margin-bottom: 14px;
       line-height: 1.45;
-    }}
-    .controls {{
+    }
+    .controls {
       display:flex;
       align-items:center;
       gap: 10px;
@@ -891,8 +698,8 @@ def build_simulator_html(sim_rows, selected_img: str = ""):
       padding: 10px 12px;
       box-shadow: var(--shadow2);
       backdrop-filter: blur(10px);
-    }}
-    .controls button {{
+    }
+    .controls button {
       padding: 7px 12px;
       font-size: 13px;
       cursor: pointer;
@@ -901,49 +708,49 @@ def build_simulator_html(sim_rows, selected_img: str = ""):
       border: 1px solid rgba(255,255,255,0.16);
       border-radius: 10px;
       transition: transform .08s ease, background .15s ease, border-color .15s ease, opacity .15s ease;
-    }}
-    .controls button:hover {{
+    }
+    .controls button:hover {
       background: rgba(255,255,255,0.14);
       border-color: rgba(255,255,255,0.26);
-    }}
-    .controls button:active {{
+    }
+    .controls button:active {
       transform: translateY(1px);
-    }}
+    }
 
-    .status {{
+    .status {
       font-size: 12px;
       color: var(--muted);
       margin: 6px 0 10px;
       min-height: 16px;
-    }}
+    }
 
-    .preview-wrap {{
+    .preview-wrap {
       display:flex;
       flex-wrap:wrap;
       gap: 16px;
       align-items: flex-start;
-    }}
-    .canvas-box {{
+    }
+    .canvas-box {
       background: var(--panel);
       border: 1px solid var(--line);
       border-radius: var(--radius);
       padding: 10px;
       box-shadow: var(--shadow2);
       backdrop-filter: blur(10px);
-    }}
-    .canvas-box h2 {{
+    }
+    .canvas-box h2 {
       font-size: 13px;
       margin: 0 0 8px;
       color: rgba(255,255,255,0.78);
-    }}
-    #previewCanvas {{
+    }
+    #previewCanvas {
       display:block;
       background:#fff;
       border: 1px solid rgba(255,255,255,0.18);
       border-radius: 10px;
-    }}
+    }
 
-    .meta-box {{
+    .meta-box {
       flex: 1;
       min-width: 320px;
       background: var(--panel);
@@ -952,60 +759,60 @@ def build_simulator_html(sim_rows, selected_img: str = ""):
       padding: 12px;
       box-shadow: var(--shadow2);
       backdrop-filter: blur(10px);
-    }}
-    .meta-title {{
+    }
+    .meta-title {
       font-size: 13px;
       color: rgba(255,255,255,0.78);
       margin: 0 0 10px;
-    }}
-    .kpi {{
+    }
+    .kpi {
       display:grid;
       grid-template-columns: 1fr 1fr;
       gap: 10px;
       margin-bottom: 12px;
       padding-bottom: 10px;
       border-bottom: 1px solid rgba(255,255,255,0.10);
-    }}
-    .kpi .cell {{
+    }
+    .kpi .cell {
       background: rgba(255,255,255,0.06);
       border: 1px solid rgba(255,255,255,0.10);
       border-radius: 12px;
       padding: 10px;
-    }}
-    .kpi .label {{
+    }
+    .kpi .label {
       font-size: 11px;
       color: var(--muted2);
       margin-bottom: 4px;
-    }}
-    .kpi .value {{
+    }
+    .kpi .value {
       font-size: 16px;
       font-weight: 700;
       color: var(--text);
       line-height: 1.2;
       word-break: break-word;
-    }}
-    .kpi .value.accent {{
+    }
+    .kpi .value.accent {
       color: var(--accent2);
-    }}
+    }
 
-    .field {{
+    .field {
       display:flex;
       gap: 10px;
       margin-bottom: 8px;
       line-height: 1.45;
       font-size: 12px;
-    }}
-    .field .label {{
+    }
+    .field .label {
       width: 92px;
       flex: 0 0 92px;
       color: var(--muted2);
-    }}
-    .field .value {{
+    }
+    .field .value {
       flex: 1;
       color: var(--text);
       word-break: break-word;
-    }}
-    .mono {{
+    }
+    .mono {
       font-family: ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", "Courier New", monospace;
       font-size: 11px;
       color: rgba(255,255,255,0.80);
@@ -1015,12 +822,12 @@ def build_simulator_html(sim_rows, selected_img: str = ""):
       border: 1px solid rgba(255,255,255,0.10);
       border-radius: 12px;
       padding: 10px;
-    }}
+    }
 
-    @media (max-width: 560px) {{
-      .kpi {{ grid-template-columns: 1fr; }}
-      .meta-box {{ min-width: 0; }}
-    }}
+    @media (max-width: 560px) {
+      .kpi { grid-template-columns: 1fr; }
+      .meta-box { min-width: 0; }
+    }
   </style>
 </head>
 <body>
@@ -1087,355 +894,51 @@ def build_simulator_html(sim_rows, selected_img: str = ""):
   </div>
 
   <script>
-    const PHOTOS = {data_json};
-    const SELECTED_IMG = {selected_json};
-
-    const byDate = new Map();
-    for (const p of PHOTOS) {{
-      if (!p.date) continue;
-      if (!byDate.has(p.date)) byDate.set(p.date, []);
-      byDate.get(p.date).push(p);
-    }}
-    for (const [d, arr] of byDate.entries()) {{
-      arr.sort((a, b) => ((b.memory ?? -1) - (a.memory ?? -1)));
-    }}
-
-    const canvas = document.getElementById('previewCanvas');
-    const ctx = canvas.getContext('2d');
-    const statusLine = document.getElementById('statusLine');
-
-    const kpiDate = document.getElementById('kpiDate');
-    const kpiLocation = document.getElementById('kpiLocation');
-    const kpiMemory = document.getElementById('kpiMemory');
-    const kpiBeauty = document.getElementById('kpiBeauty');
-    const kpiSide = document.getElementById('kpiSide');
-
-    const fieldPath = document.getElementById('fieldPath');
-    const fieldOrigPath = document.getElementById('fieldOrigPath');
-    const fieldType = document.getElementById('fieldType');
-    const fieldCaption = document.getElementById('fieldCaption');
-    const fieldReason = document.getElementById('fieldReason');
-    const fieldRes = document.getElementById('fieldRes');
-    const fieldOrientation = document.getElementById('fieldOrientation');
-    const fieldUsedAt = document.getElementById('fieldUsedAt');
-    const fieldExifSummary = document.getElementById('fieldExifSummary');
-    const fieldExifJson = document.getElementById('fieldExifJson');
-
-    let currentDate = null;
-    let currentPhoto = null;
-
-    function formatLocation(lat, lon, city) {{
-      const c = (city || '').trim();
-      if (c.length > 0) return c;
-      if (lat == null || lon == null) return '';
-      try {{
-        return Number(lat).toFixed(5) + ', ' + Number(lon).toFixed(5);
-      }} catch (e) {{
-        return String(lat) + ', ' + String(lon);
-      }}
-    }}
-
-    function formatDateDisplay(dateStr) {{
-      if (!dateStr) return '';
-      const parts = dateStr.split('-');
-      if (parts.length < 3) return dateStr;
-      const y = parts[0];
-      const m = String(parseInt(parts[1], 10));
-      const d = String(parseInt(parts[2], 10));
-      return y + '.' + m + '.' + d;
-    }}
-
-    function safeText(v) {{
-      if (v === null || v === undefined) return '';
-      return String(v);
-    }}
-
-    function wrapText(ctx, text, x, y, maxWidth, lineHeight, maxLines) {{
-      if (!text) return;
-      const words = text.split(/\\s+/);
-      let line = '';
-      let lineCount = 0;
-      for (let n = 0; n < words.length; n++) {{
-        const testLine = line ? (line + ' ' + words[n]) : words[n];
-        const metrics = ctx.measureText(testLine);
-        if (metrics.width > maxWidth && n > 0) {{
-          ctx.fillText(line, x, y);
-          line = words[n];
-          y += lineHeight;
-          lineCount++;
-          if (lineCount >= maxLines) break;
-        }} else {{
-          line = testLine;
-        }}
-      }}
-      if (line && lineCount < maxLines) ctx.fillText(line, x, y);
-    }}
-
-    function applyFourColorDither() {{
-      const w = canvas.width, h = canvas.height;
-      let imgData;
-      try {{
-        imgData = ctx.getImageData(0, 0, w, h);
-      }} catch (e) {{
-        statusLine.textContent = '无法从画布读取像素（跨域或图片未走 /images）：' + e;
-        return;
-      }}
-      const data = imgData.data;
-
-      const palette = [
-        {{ r: 0, g: 0, b: 0 }},
-        {{ r: 255, g: 255, b: 255 }},
-        {{ r: 200, g: 0, b: 0 }},
-        {{ r: 220, g: 180, b: 0 }}
-      ];
-
-      const errR = new Float32Array(w);
-      const errG = new Float32Array(w);
-      const errB = new Float32Array(w);
-      const nextErrR = new Float32Array(w);
-      const nextErrG = new Float32Array(w);
-      const nextErrB = new Float32Array(w);
-
-      function nearestColor(r, g, b) {{
-        let bestIndex = 0;
-        let bestDist = Infinity;
-        for (let i = 0; i < palette.length; i++) {{
-          const pr = palette[i].r, pg = palette[i].g, pb = palette[i].b;
-          const dr = r - pr, dg = g - pg, db = b - pb;
-          const dist = dr*dr + dg*dg + db*db;
-          if (dist < bestDist) {{ bestDist = dist; bestIndex = i; }}
-        }}
-        return palette[bestIndex];
-      }}
-
-      for (let y = 0; y < h; y++) {{
-        for (let x = 0; x < w; x++) {{
-          const idx = (y * w + x) * 4;
-
-          let r = data[idx] + errR[x];
-          let g = data[idx + 1] + errG[x];
-          let b = data[idx + 2] + errB[x];
-
-          r = r < 0 ? 0 : (r > 255 ? 255 : r);
-          g = g < 0 ? 0 : (g > 255 ? 255 : g);
-          b = b < 0 ? 0 : (b > 255 ? 255 : b);
-
-          const nc = nearestColor(r, g, b);
-
-          data[idx] = nc.r;
-          data[idx + 1] = nc.g;
-          data[idx + 2] = nc.b;
-
-          const er = r - nc.r, eg = g - nc.g, eb = b - nc.b;
-
-          if (x + 1 < w) {{
-            errR[x + 1] += er * (7 / 16);
-            errG[x + 1] += eg * (7 / 16);
-            errB[x + 1] += eb * (7 / 16);
-          }}
-          if (y + 1 < h) {{
-            if (x > 0) {{
-              nextErrR[x - 1] += er * (3 / 16);
-              nextErrG[x - 1] += eg * (3 / 16);
-              nextErrB[x - 1] += eb * (3 / 16);
-            }}
-            nextErrR[x] += er * (5 / 16);
-            nextErrG[x] += eg * (5 / 16);
-            nextErrB[x] += eb * (5 / 16);
-            if (x + 1 < w) {{
-              nextErrR[x + 1] += er * (1 / 16);
-              nextErrG[x + 1] += eg * (1 / 16);
-              nextErrB[x + 1] += eb * (1 / 16);
-            }}
-          }}
-        }}
-
-        if (y + 1 < h) {{
-          for (let i = 0; i < w; i++) {{
-            errR[i] = nextErrR[i]; errG[i] = nextErrG[i]; errB[i] = nextErrB[i];
-            nextErrR[i] = 0; nextErrG[i] = 0; nextErrB[i] = 0;
-          }}
-        }}
-      }}
-
-      ctx.putImageData(imgData, 0, 0);
-    }}
-
-    function updateMeta(photo) {{
-      if (!photo) {{
-        kpiDate.textContent = '';
-        kpiLocation.textContent = '';
-        kpiMemory.textContent = '';
-        kpiBeauty.textContent = '';
-        kpiSide.textContent = '';
-
-        fieldPath.textContent = '';
-        fieldOrigPath.textContent = '';
-        fieldType.textContent = '';
-        fieldCaption.textContent = '';
-        fieldReason.textContent = '';
-        fieldRes.textContent = '';
-        fieldOrientation.textContent = '';
-        fieldUsedAt.textContent = '';
-        fieldExifSummary.textContent = '';
-        fieldExifJson.textContent = '';
-        return;
-      }}
-
-      const loc = formatLocation(photo.lat, photo.lon, photo.city);
-      const mem = (photo.memory === null || photo.memory === undefined) ? '' : Number(photo.memory).toFixed(1);
-      const bea = (photo.beauty === null || photo.beauty === undefined) ? '' : Number(photo.beauty).toFixed(1);
-
-      kpiDate.textContent = safeText(photo.date);
-      kpiLocation.textContent = safeText(loc);
-      kpiMemory.textContent = safeText(mem);
-      kpiBeauty.textContent = safeText(bea);
-      kpiSide.textContent = safeText(photo.side);
-
-      fieldPath.textContent = safeText(photo.path);
-      fieldOrigPath.textContent = safeText(photo.orig_path || '');
-      fieldType.textContent = safeText(photo.type);
-      fieldCaption.textContent = safeText(photo.caption);
-      fieldReason.textContent = safeText(photo.reason);
-
-      const res = (safeText(photo.width) || safeText(photo.height)) ? (safeText(photo.width) + ' x ' + safeText(photo.height)) : '';
-      fieldRes.textContent = res;
-      fieldOrientation.textContent = safeText(photo.orientation);
-      fieldUsedAt.textContent = safeText(photo.used_at);
-
-      fieldExifSummary.textContent = safeText(photo.exif_summary);
-      fieldExifJson.textContent = safeText(photo.exif_json);
-    }}
-
-    function drawPreview(photo) {{
-      if (!photo) {{
-        statusLine.textContent = '未指定照片。请从 /review 点击某张照片进入模拟器。';
-        return;
-      }}
-
-      statusLine.textContent = ''; // 正常情况不显示废话
-
-      canvas.width = 480;
-      canvas.height = 800;
-
-      ctx.fillStyle = '#FFFFFF';
-      ctx.fillRect(0, 0, canvas.width, canvas.height);
-
-      const img = new Image();
-      img.onload = function() {{
-          canvas.width = 480;
-          canvas.height = 800;
-          ctx.clearRect(0, 0, canvas.width, canvas.height);
-          ctx.drawImage(img, 0, 0, 480, 800);
-        }};
-      img.onerror = function() {{
-        statusLine.textContent = '图片加载失败：' + photo.path;
-      }};
-      img.src = '/sim_render?img=' + encodeURIComponent(photo.path);
-    }}
-
-    function pickPhotoFromDate(date) {{
-      const arr = byDate.get(date) || [];
-      if (!arr.length) return null;
-
-      const THRESHOLD = {float(getattr(cfg, "MEMORY_THRESHOLD", 70.0) or 70.0)};
-      const candidates = arr.filter(p => p.memory != null && p.memory > THRESHOLD);
-      if (candidates.length > 0) {{
-        const idx = Math.floor(Math.random() * candidates.length);
-        return {{ photo: candidates[idx], dateUsed: date }};
-      }}
-
-      // 兜底：当天随便挑
-      const idx = Math.floor(Math.random() * arr.length);
-      return {{ photo: arr[idx], dateUsed: date, fallbackNoThreshold: true }};
-    }}
-
-    function getPreviousDateStr(dateStr) {{
-      if (!dateStr) return null;
-      const parts = dateStr.split('-');
-      if (parts.length < 3) return null;
-      const y = parseInt(parts[0], 10);
-      const m = parseInt(parts[1], 10);
-      const d = parseInt(parts[2], 10);
-      if (!y || !m || !d) return null;
-      const dt = new Date(y, m - 1, d);
-      dt.setDate(dt.getDate() - 1);
-      const yy = dt.getFullYear();
-      const mm = String(dt.getMonth() + 1).padStart(2, '0');
-      const dd = String(dt.getDate()).padStart(2, '0');
-      return yy + '-' + mm + '-' + dd;
-    }}
-
-    function pickPhotoWithLookback(baseDate) {{
-      if (!baseDate) return null;
-      let date = baseDate;
-      const MAX_LOOKBACK = 30;
-
-      for (let i = 0; i < MAX_LOOKBACK; i++) {{
-        const picked = pickPhotoFromDate(date);
-        if (picked && picked.photo) return picked;
-        const prev = getPreviousDateStr(date);
-        if (!prev) break;
-        date = prev;
-      }}
-
-      // 最终兜底：目标日期没找到 map，啥也不干
-      return null;
-    }}
-
-    function findSelectedPhoto() {{
-      if (!SELECTED_IMG) return null;
-      for (const p of PHOTOS) {{
-        if (p.path === SELECTED_IMG) return p;
-      }}
-      return null;
-    }}
-
-    function onRerollSameDay() {{
-      if (!currentDate) {{
-        statusLine.textContent = '请从 /review 点击某张照片进入模拟器。';
-        return;
-      }}
-
-      const pick = pickPhotoWithLookback(currentDate);
-      if (!pick || !pick.photo) {{
-        statusLine.textContent = '该日期及向前 30 天内没有可用照片。';
-        return;
-      }}
-
-      // 如果刚好又抽到自己，尝试再抽几次
-      let tries = 0;
-      let chosen = pick;
-      while (tries < 6 && chosen && chosen.photo && currentPhoto && chosen.photo.path === currentPhoto.path) {{
-        const again = pickPhotoWithLookback(currentDate);
-        if (!again || !again.photo) break;
-        chosen = again;
-        tries++;
-      }}
-
-      currentPhoto = chosen.photo;
-      updateMeta(currentPhoto);
-      drawPreview(currentPhoto);
-    }}
-
-    document.getElementById('rerollBtn').addEventListener('click', onRerollSameDay);
-
-    // 默认进入：如果从 review 点进来，则显示该照片；否则提示用户从 review 进入
-    const initPhoto = findSelectedPhoto();
-    if (!initPhoto) {{
-      updateMeta(null);
-      drawPreview(null);
-    }} else {{
-      currentDate = initPhoto.date;
-      currentPhoto = initPhoto;
-      updateMeta(currentPhoto);
-      drawPreview(currentPhoto);
-    }}
+""".encode("utf-8")
+
+_SIM_TAIL = f"""    const MEMORY_THRESHOLD = {float(getattr(cfg, "MEMORY_THRESHOLD", 70.0) or 70.0)};
+    const RENDER_VERSION = "{SIM_RENDER_FINGERPRINT}";
   </script>
+  <script src="/static/sim.js"></script>
 </body>
 </html>
-"""
-    return html_str
+""".encode("utf-8")
+
+
+def build_simulator_html(sim_rows, selected_img: str = ""):
+    # 按拍摄日期分好组、组内按回忆度从高到低排好，前端直接按日期取用
+    by_date = defaultdict(list)
+    for row in sim_rows:
+        date_str = extract_date_from_exif(row["j_datetime"])
+        if not date_str:  # datetime 存在但格式无法解析
+            continue
+
+        memory_score = row["memory_score"]
+        by_date[date_str].append({
+            "path": _make_image_url(str(row["path"])),
+            "date": date_str,
+            "memory": float(memory_score) if memory_score is not None else None,
+            # 预览图 URL 的指纹：analyze_photos 每次（重新）写入这一行都会分配新 rowid
+            "v": row["rowid"],
+        })
+
+    for photos in by_date.values():
+        photos.sort(key=lambda x: -(x["memory"] if x["memory"] is not None else -1))
+
+    # orjson 直接输出 UTF-8 bytes，整页按 bytes 拼接，Response 不用再编码一遍；
+    # "</" 转义成 "<\/"，避免数据里的 "</script>" 提前结束脚本
+    data_json = orjson.dumps(by_date).replace(b"</", b"<\\/")
+    # 有照片的日期，新到旧排好；前端往前回溯时直接沿着它走，不用逐天构造 Date
+    sorted_dates_json = orjson.dumps(sorted(by_date, reverse=True))
+    selected_json = orjson.dumps(selected_img or "").replace(b"</", b"<\\/")
+
+    return b"".join((
+        _SIM_HEAD,
+        b"    const BY_DATE = ", data_json, b";\n",
+        b"    const SORTED_DATES = ", sorted_dates_json, b";\n",
+        b"    const SELECTED_IMG = ", selected_json, b";\n",
+        _SIM_TAIL,
+    ))
 
 
 # --------------------------
@@ -1449,6 +952,36 @@ def index():
     return Response("InkTime server running. WebUI disabled.", mimetype="text/plain; charset=utf-8")
 
 
+def _parse_md(month: str, day: str) -> str:
+    """把 ?month=&day= 转成 "MM-DD"；不完整或非法则返回空（不筛选）。"""
+    try:
+        m = int(month)
+        d = int(day)
+    except ValueError:
+        return ""
+    if not (1 <= m <= 12 and 1 <= d <= 31):
+        return ""
+    return f"{m:02d}-{d:02d}"
+
+
+def _review_status(md: str, total_count: int) -> str:
+    """按月日筛选时的提示语；没有命中则报告全库里最近的有照片的月日。"""
+    if not md:
+        return ""
+    m, d = (int(x) for x in md.split("-"))
+    if total_count > 0:
+        return f"找到 {total_count} 张 {m} 月 {d} 日 的照片。"
+
+    md_counts = load_md_counts()
+    if not md_counts:
+        return "没有找到任何带日期的照片。"
+    target = rdp.md_to_day_of_year(md)
+    closest = min(md_counts, key=lambda x: abs(rdp.md_to_day_of_year(x) - target))
+    cm, cd = (int(x) for x in closest.split("-"))
+    return (f"没有 {m} 月 {d} 日 的照片。最近的是 {cm} 月 {cd} 日，"
+            f"共有 {md_counts[closest]} 张。")
+
+
 @app.get("/review")
 def review():
     _require_webui_enabled()
@@ -1457,42 +990,73 @@ def review():
     except Exception:
         page = 1
 
-    rows, total_count = load_rows(page=page, page_size=REVIEW_PAGE_SIZE)
-    if not rows:
+    month = request.args.get("month", "")
+    day = request.args.get("day", "")
+    sort = request.args.get("sort", "memory")
+    if sort not in REVIEW_ORDER_BY:
+        sort = "memory"
+
+    status = ""
+    if request.args.get("random"):
+        md_counts = load_md_counts()
+        if md_counts:
+            month, day = random.choice(list(md_counts)).split("-")
+            return redirect(f"/review?month={month}&day={day}&sort={sort}")
+        status = "没有任何带日期的照片，无法随机选择。"
+
+    html_str = _render_review_page(page, month, day, sort, status, load_db_snapshot())
+    if html_str is None:
         return Response(
             "数据库里没有可展示的数据。请先运行你的分析脚本生成评分与文案。",
             status=404,
             mimetype="text/plain; charset=utf-8",
         )
-
-    html_str = build_html(rows, page=page, page_size=REVIEW_PAGE_SIZE, total_count=total_count)
     return Response(html_str, mimetype="text/html; charset=utf-8")
 
 
+@lru_cache(maxsize=REVIEW_HTML_CACHE_SIZE)
+def _render_review_page(page: int, month: str, day: str, sort: str, status: str,
+                        snapshot: tuple[int, int]) -> str | None:
+    """
+    渲染一整页 review HTML；同一数据库快照下相同参数的请求直接命中缓存，
+    不再查询与渲染。snapshot 只参与缓存键（见 load_db_snapshot）。没有数据时返回 None。
+    """
+    md = _parse_md(month, day)
+    rows, total_count = load_rows(page=page, page_size=REVIEW_PAGE_SIZE, md=md, sort=sort)
+    if not rows and not md:
+        return None
+
+    return build_html(
+        rows,
+        page=page,
+        page_size=REVIEW_PAGE_SIZE,
+        total_count=total_count,
+        month=month,
+        day=day,
+        sort=sort,
+        status=status or _review_status(md, total_count),
+    )
+
+
 @app.get("/sim")
 def sim():
     _require_webui_enabled()
     selected_img = request.args.get("img", "")
-    sim_rows = load_sim_rows()
-
-    html_str = build_simulator_html(sim_rows, selected_img=selected_img)
-    return Response(html_str, mimetype="text/html; charset=utf-8")
+    html_bytes = build_simulator_html(iter_sim_rows(), selected_img=selected_img)
+    return Response(html_bytes, mimetype="text/html; charset=utf-8")
 
 
 @app.get("/images/<path:subpath>")
 def images(subpath: str):
     _require_webui_enabled()
     try:
-        p = _safe_join(IMAGE_DIR, subpath)
+        _safe_join(IMAGE_DIR, subpath)  # 预检：连同符号链接在内都不能指到 IMAGE_DIR 之外
     except Exception:
         abort(400)
-    return _send_static_file(p)
+    return _send_static_file(IMAGE_DIR, subpath, max_age=IMAGE_CACHE_MAX_AGE, immutable=True)
 
-@app.get("/sim_render")
-def sim_render():
-    _require_webui_enabled()
-
-    img_uri = request.args.get("img", "")
+def _image_path_from_uri(img_uri: str) -> Path:
+    """把 /images/... 形式的 URL 还原成 IMAGE_DIR 下的本地文件路径；非法返回 400，不存在返回 404。"""
     if not img_uri or not img_uri.startswith("/images/"):
         abort(400)
 
@@ -1504,8 +1068,38 @@ def sim_render():
 
     if not p.exists() or not p.is_file():
         abort(404)
+    return p
+
+
+def _image_db_paths(img_uri: str) -> tuple[str, ...]:
+    """
+    /images/... URL 对应的 photo_scores.path 候选（_make_image_url 的逆运算）：
+    数据库里存的是配置的 IMAGE_DIR 写法，IMAGE_DIR 是符号链接时与 resolve() 后的路径不同。
+    """
+    subpath = img_uri[len("/images/"):].replace("/", os.sep)
+    return tuple(prefix + subpath for prefix in _IMAGE_DIR_PREFIXES)
+
+
+@app.get("/api/photo")
+def api_photo():
+    """模拟器按需读取当前照片的详情字段（EXIF JSON、文案等不再内联进 /sim 页面）。"""
+    _require_webui_enabled()
+    img_uri = request.args.get("img", "")
+    _image_path_from_uri(img_uri)
+    detail = get_photo_detail_by_path(_image_db_paths(img_uri))
+    if detail is None:
+        abort(404)
+    return detail
+
+
+@app.get("/sim_render")
+def sim_render():
+    _require_webui_enabled()
+
+    img_uri = request.args.get("img", "")
+    p = _image_path_from_uri(img_uri)
 
-    meta = get_photo_meta_by_path(str(p))
+    meta = get_photo_meta_by_path(_image_db_paths(img_uri))
     if meta is None:
         # 兜底：DB 没命中就渲染纯图（不建议长期这样）
         meta = {
@@ -1518,41 +1112,83 @@ def sim_render():
             "city": "",
         }
 
+    # 渲染结果只取决于原图、meta 和字体，按 (路径, mtime, meta, 渲染指纹) 缓存到磁盘，命中时直接发文件
+    key_src = "|".join(str(x) for x in (
+        p, p.stat().st_mtime_ns, meta["date"], meta["side"], meta["city"], meta["lat"], meta["lon"],
+        SIM_RENDER_FINGERPRINT,
+    ))
+    cached = SIM_CACHE_DIR / f"{hashlib.sha1(key_src.encode('utf-8')).hexdigest()}.png"
+    # 带指纹（?v=）的 URL 内容不会变，浏览器可以长期缓存，重抽回看过的照片不再发请求
+    max_age, immutable = (IMAGE_CACHE_MAX_AGE, True) if request.args.get("v") else (None, False)
+    if cached.is_file():
+        return _send_static_file(SIM_CACHE_DIR, cached.name, max_age=max_age, immutable=immutable)
+
     try:
         img = rdp.render_image(meta)
-        img_dithered = rdp.apply_four_color_dither(img)
+        img_dithered = rdp.quantize_four_color(img)
 
-        bio = BytesIO()
-        img_dithered.save(bio, format="PNG")
-        bio.seek(0)
-        return send_file(bio, mimetype="image/png", as_attachment=False)
+        SIM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=SIM_CACHE_DIR, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # 抖动结果本身就是 4 色调色板图，直接存 PNG（每像素 2 bit），低压缩级别省 CPU
+                img_dithered.save(f, format="PNG", optimize=False, compress_level=1)
+            os.replace(tmp, cached)  # 原子替换，并发请求不会读到写了一半的文件
+        except Exception:
+            os.remove(tmp)
+            raise
     except Exception:
         abort(500)
 
+    _sweep_sim_cache(keep=cached)
+    return _send_static_file(SIM_CACHE_DIR, cached.name, max_age=max_age, immutable=immutable)
+
+
+def _sweep_sim_cache(keep: Path) -> None:
+    """
+    缓存目录超过 SIM_CACHE_MAX_BYTES 时，按访问时间从旧到新删除，直到降到上限的 80%。
+    keep 是刚写入、马上要发送的文件，不参与删除。
+    """
+    try:
+        entries = [(e.stat().st_atime, e.stat().st_size, e.path)
+                   for e in os.scandir(SIM_CACHE_DIR) if e.name.endswith(".png") and e.name != keep.name]
+    except OSError:
+        return
+
+    total = sum(size for _, size, _ in entries) + keep.stat().st_size
+    if total <= SIM_CACHE_MAX_BYTES:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        if total <= SIM_CACHE_MAX_BYTES * 0.8:
+            break
+
 @app.get("/static/inktime/<key>/photo_<int:idx>.bin")
 def esp_photo(key: str, idx: int):
     if key != DOWNLOAD_KEY:
         abort(404)
     if idx < 0 or idx >= DAILY_PHOTO_QUANTITY:
         abort(404)
-    p = BIN_OUTPUT_DIR / f"photo_{idx}.bin"
-    return _send_static_file(p)
+    return _send_output_file(f"photo_{idx}.bin")
 
 
 @app.get("/static/inktime/<key>/latest.bin")
 def esp_latest(key: str):
     if key != DOWNLOAD_KEY:
         abort(404)
-    p = BIN_OUTPUT_DIR / "latest.bin"
-    return _send_static_file(p)
+    return _send_output_file("latest.bin")
 
 
 @app.get("/static/inktime/<key>/preview.png")
 def esp_preview(key: str):
     if key != DOWNLOAD_KEY:
         abort(404)
-    p = BIN_OUTPUT_DIR / "preview.png"
-    return _send_static_file(p)
+    return _send_output_file("preview.png")
 
 
 @app.get("/files/")
@@ -1565,7 +1201,7 @@ def browse(subpath: str = ""):
         abort(400)
 
     if p.is_file():
-        return _send_static_file(p)
+        return _send_output_file(subpath)
 
     if not p.exists() or not p.is_dir():
         abort(404)
@@ -1575,13 +1211,13 @@ def browse(subpath: str = ""):
         name = child.name + ("/" if child.is_dir() else "")
         rel = child.relative_to(BIN_OUTPUT_DIR)
         href = "/files/" + str(rel).replace("\\", "/")
-        items.append(f'<li><a href="{html.escape(href)}">{html.escape(name)}</a></li>')
+        items.append(f'<li><a href="{escape(href)}">{escape(name)}</a></li>')
 
     up = ""
     if p != BIN_OUTPUT_DIR:
         parent_rel = p.parent.relative_to(BIN_OUTPUT_DIR)
         up_href = "/files/" + str(parent_rel).replace("\\", "/")
-        up = f'<a href="{html.escape(up_href)}">⬅ 返回上级</a><br><br>'
+        up = f'<a href="{escape(up_href)}">⬅ 返回上级</a><br><br>'
 
     return f"""<!doctype html>
 <html lang="zh-CN">
@@ -1596,7 +1232,7 @@ code {{ background:#f2f2f2; padding:2px 6px; border-radius:4px; }}
 </head>
 <body>
 <h3>输出目录浏览</h3>
-<p>当前：<code>{html.escape(str(p.relative_to(BIN_OUTPUT_DIR) if p != BIN_OUTPUT_DIR else "."))}</code></p>
+<p>当前：<code>{escape(str(p.relative_to(BIN_OUTPUT_DIR) if p != BIN_OUTPUT_DIR else "."))}</code></p>
 {up}
 <ul>
 {''.join(items)}
@@ -1606,6 +1242,7 @@ code {{ background:#f2f2f2; padding:2px 6px; border-radius:4px; }}
 """
 
 
+# 本地调试用 Flask 开发服务器；长期运行请用 gunicorn（见 gunicorn.conf.py）
 if __name__ == "__main__":
     mimetypes.add_type("application/octet-stream", ".bin")
     print(f"[InkTime] DB: {DB_PATH}")
@@ -0,0 +1,67 @@
+document.addEventListener('DOMContentLoaded', function () {
+  const monthSelect = document.getElementById('monthFilter');
+  const daySelect = document.getElementById('dayFilter');
+  const sortSelect = document.getElementById('sortBy');
+  const randomBtn = document.getElementById('randomDateBtn');
+
+  // 筛选 / 排序都交给服务端（SQL）完成，这里只负责拼 URL
+  function setParam(url, key, value) {
+    if (value) url.searchParams.set(key, value);
+    else url.searchParams.delete(key);
+  }
+
+  function applyFilterSort() {
+    const url = new URL(window.location.href);
+    setParam(url, 'month', monthSelect.value);
+    setParam(url, 'day', daySelect.value);
+    setParam(url, 'sort', sortSelect.value);
+    url.searchParams.delete('page');
+    url.searchParams.delete('random');
+    window.location.href = url.toString();
+  }
+
+  function pickRandomDate() {
+    const url = new URL(window.location.href);
+    url.searchParams.delete('month');
+    url.searchParams.delete('day');
+    url.searchParams.delete('page');
+    url.searchParams.set('random', '1');
+    window.location.href = url.toString();
+  }
+
+  // 分页按钮
+  const currentPage = parseInt(document.body.dataset.page, 10) || 1;
+  const totalPages = parseInt(document.body.dataset.totalPages, 10) || 0;
+  const prevBtn = document.getElementById('prevPageBtn');
+  const nextBtn = document.getElementById('nextPageBtn');
+  const prevBtnBottom = document.getElementById('prevPageBtnBottom');
+  const nextBtnBottom = document.getElementById('nextPageBtnBottom');
+
+  function goPage(p) {
+    const url = new URL(window.location.href);
+    url.searchParams.set('page', String(p));
+    window.location.href = url.toString();
+  }
+
+  if (prevBtn) {
+    prevBtn.disabled = currentPage <= 1;
+    prevBtn.addEventListener('click', () => goPage(Math.max(1, currentPage - 1)));
+  }
+  if (nextBtn) {
+    nextBtn.disabled = currentPage >= totalPages;
+    nextBtn.addEventListener('click', () => goPage(Math.min(totalPages, currentPage + 1)));
+  }
+  if (prevBtnBottom) {
+    prevBtnBottom.disabled = currentPage <= 1;
+    prevBtnBottom.addEventListener('click', () => goPage(Math.max(1, currentPage - 1)));
+  }
+  if (nextBtnBottom) {
+    nextBtnBottom.disabled = currentPage >= totalPages;
+    nextBtnBottom.addEventListener('click', () => goPage(Math.min(totalPages, currentPage + 1)));
+  }
+
+  monthSelect.addEventListener('change', applyFilterSort);
+  daySelect.addEventListener('change', applyFilterSort);
+  sortSelect.addEventListener('change', applyFilterSort);
+  randomBtn.addEventListener('click', pickRandomDate);
+});
@@ -0,0 +1,257 @@
+const canvas = document.getElementById('previewCanvas');
+// 画布只用来显示服务端渲染好的不透明 PNG，不读回像素：不需要 alpha 通道，也不需要 willReadFrequently
+const ctx = canvas.getContext('2d', { alpha: false });
+const statusLine = document.getElementById('statusLine');
+
+const kpiDate = document.getElementById('kpiDate');
+const kpiLocation = document.getElementById('kpiLocation');
+const kpiMemory = document.getElementById('kpiMemory');
+const kpiBeauty = document.getElementById('kpiBeauty');
+const kpiSide = document.getElementById('kpiSide');
+
+const fieldPath = document.getElementById('fieldPath');
+const fieldOrigPath = document.getElementById('fieldOrigPath');
+const fieldType = document.getElementById('fieldType');
+const fieldCaption = document.getElementById('fieldCaption');
+const fieldReason = document.getElementById('fieldReason');
+const fieldRes = document.getElementById('fieldRes');
+const fieldOrientation = document.getElementById('fieldOrientation');
+const fieldUsedAt = document.getElementById('fieldUsedAt');
+const fieldExifSummary = document.getElementById('fieldExifSummary');
+const fieldExifJson = document.getElementById('fieldExifJson');
+
+let currentDate = null;
+let currentPhoto = null;
+
+function formatLocation(lat, lon, city) {
+  const c = (city || '').trim();
+  if (c.length > 0) return c;
+  if (lat == null || lon == null) return '';
+  try {
+    return Number(lat).toFixed(5) + ', ' + Number(lon).toFixed(5);
+  } catch (e) {
+    return String(lat) + ', ' + String(lon);
+  }
+}
+
+function formatDateDisplay(dateStr) {
+  if (!dateStr) return '';
+  const parts = dateStr.split('-');
+  if (parts.length < 3) return dateStr;
+  const y = parts[0];
+  const m = String(parseInt(parts[1], 10));
+  const d = String(parseInt(parts[2], 10));
+  return y + '.' + m + '.' + d;
+}
+
+function safeText(v) {
+  if (v === null || v === undefined) return '';
+  return String(v);
+}
+
+// /api/photo 取回的详情按图片 URL 缓存，来回重抽同一张照片不重复请求
+const detailCache = new Map();
+
+function loadPhotoDetail(photo) {
+  if (!detailCache.has(photo.path)) {
+    const req = fetch('/api/photo?img=' + encodeURIComponent(photo.path))
+      .then(r => {
+        if (!r.ok) throw new Error('HTTP ' + r.status);
+        return r.json();
+      })
+      .catch(() => {
+        detailCache.delete(photo.path); // 失败不缓存，下次切回来重试
+        return {};
+      });
+    detailCache.set(photo.path, req);
+  }
+  return detailCache.get(photo.path);
+}
+
+async function updateMeta(photo) {
+  if (!photo) {
+    kpiDate.textContent = '';
+    kpiLocation.textContent = '';
+    kpiMemory.textContent = '';
+    kpiBeauty.textContent = '';
+    kpiSide.textContent = '';
+
+    fieldPath.textContent = '';
+    fieldOrigPath.textContent = '';
+    fieldType.textContent = '';
+    fieldCaption.textContent = '';
+    fieldReason.textContent = '';
+    fieldRes.textContent = '';
+    fieldOrientation.textContent = '';
+    fieldUsedAt.textContent = '';
+    fieldExifSummary.textContent = '';
+    fieldExifJson.textContent = '';
+    return;
+  }
+
+  // 页面里内联的轻量字段先显示，其余字段等 /api/photo 返回再填
+  const mem = (photo.memory === null || photo.memory === undefined) ? '' : Number(photo.memory).toFixed(1);
+  kpiDate.textContent = safeText(photo.date);
+  kpiMemory.textContent = safeText(mem);
+  fieldPath.textContent = safeText(photo.path);
+  fieldOrigPath.textContent = safeText(photo.orig_path || '');
+
+  // 先清空重字段，避免请求返回前显示上一张照片的信息
+  for (const el of [kpiLocation, kpiBeauty, kpiSide, fieldType, fieldCaption, fieldReason,
+                    fieldRes, fieldOrientation, fieldUsedAt, fieldExifSummary, fieldExifJson]) {
+    el.textContent = '';
+  }
+
+  const detail = await loadPhotoDetail(photo);
+  if (photo !== currentPhoto) return; // 请求返回前已经换了照片
+
+  const loc = formatLocation(detail.lat, detail.lon, detail.city);
+  const bea = (detail.beauty === null || detail.beauty === undefined) ? '' : Number(detail.beauty).toFixed(1);
+
+  kpiLocation.textContent = safeText(loc);
+  kpiBeauty.textContent = safeText(bea);
+  kpiSide.textContent = safeText(detail.side);
+
+  fieldType.textContent = safeText(detail.type);
+  fieldCaption.textContent = safeText(detail.caption);
+  fieldReason.textContent = safeText(detail.reason);
+
+  const res = (safeText(detail.width) || safeText(detail.height)) ? (safeText(detail.width) + ' x ' + safeText(detail.height)) : '';
+  fieldRes.textContent = res;
+  fieldOrientation.textContent = safeText(detail.orientation);
+  fieldUsedAt.textContent = safeText(detail.used_at);
+
+  fieldExifSummary.textContent = safeText(detail.exif_summary);
+  fieldExifJson.textContent = safeText(detail.exif_json);
+}
+
+async function drawPreview(photo) {
+  if (!photo) {
+    statusLine.textContent = '未指定照片。请从 /review 点击某张照片进入模拟器。';
+    return;
+  }
+
+  statusLine.textContent = ''; // 正常情况不显示废话
+
+  canvas.width = 480;
+  canvas.height = 800;
+
+  ctx.fillStyle = '#FFFFFF';
+  ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+  // /sim_render 返回的已经是服务端渲染 + 四色抖动好的 PNG，前端只需 1:1 画到画布上；
+  // createImageBitmap 在后台线程解码，不阻塞主线程
+  try {
+    // v 是照片行的版本 + 渲染版本，内容变了 URL 就变，服务端因此可以让浏览器长期缓存
+    const r = await fetch('/sim_render?img=' + encodeURIComponent(photo.path) + '&v=' + RENDER_VERSION + '.' + photo.v);
+    if (!r.ok) throw new Error(r.status);
+    const bmp = await createImageBitmap(await r.blob(), {
+      resizeWidth: 480, resizeHeight: 800, resizeQuality: 'pixelated'
+    });
+    if (photo === currentPhoto) {  // 解码期间没有换照片才画
+      ctx.clearRect(0, 0, canvas.width, canvas.height);
+      ctx.drawImage(bmp, 0, 0);
+    }
+    bmp.close();
+  } catch (e) {
+    if (photo === currentPhoto) statusLine.textContent = '图片加载失败：' + photo.path;
+  }
+}
+
+function pickPhotoFromDate(date, excludePath) {
+  const arr = BY_DATE[date] || [];
+  if (!arr.length) return null;
+
+  // 优先在回忆度达标的照片里挑；一张都没有时兜底：当天随便挑
+  const candidates = arr.filter(p => p.memory != null && p.memory > MEMORY_THRESHOLD);
+  const fallbackNoThreshold = candidates.length === 0;
+  const pool = fallbackNoThreshold ? arr : candidates;
+
+  // 避开 excludePath（当前显示的那张），除非它是这一档里唯一的一张
+  const others = excludePath ? pool.filter(p => p.path !== excludePath) : pool;
+  const choices = others.length ? others : pool;
+
+  const idx = Math.floor(Math.random() * choices.length);
+  const picked = { photo: choices[idx], dateUsed: date };
+  if (fallbackNoThreshold) picked.fallbackNoThreshold = true;
+  return picked;
+}
+
+const MAX_LOOKBACK = 30;
+const DATE_INDEX = new Map(SORTED_DATES.map((d, i) => [d, i]));
+
+// baseDate 往前 MAX_LOOKBACK - 1 天的日期字符串（回溯窗口的下界，含）
+function lookbackCutoff(baseDate) {
+  const parts = baseDate.split('-');
+  if (parts.length < 3) return null;
+  const y = parseInt(parts[0], 10);
+  const m = parseInt(parts[1], 10);
+  const d = parseInt(parts[2], 10);
+  if (!y || !m || !d) return null;
+  const dt = new Date(y, m - 1, d - (MAX_LOOKBACK - 1));
+  const yy = dt.getFullYear();
+  const mm = String(dt.getMonth() + 1).padStart(2, '0');
+  const dd = String(dt.getDate()).padStart(2, '0');
+  return yy + '-' + mm + '-' + dd;
+}
+
+function pickPhotoWithLookback(baseDate, excludePath) {
+  if (!baseDate) return null;
+  const cutoff = lookbackCutoff(baseDate);
+  if (!cutoff) return null;
+
+  // 从 baseDate（或它之前最近的有照片的日期）开始，沿 SORTED_DATES 往旧的方向走
+  let i = DATE_INDEX.get(baseDate);
+  if (i === undefined) i = SORTED_DATES.findIndex(d => d <= baseDate);
+  if (i < 0) return null;
+
+  for (; i < SORTED_DATES.length && SORTED_DATES[i] >= cutoff; i++) {
+    const picked = pickPhotoFromDate(SORTED_DATES[i], excludePath);
+    if (picked && picked.photo) return picked;
+  }
+
+  // 最终兜底：回溯窗口内没有照片，啥也不干
+  return null;
+}
+
+function findSelectedPhoto() {
+  if (!SELECTED_IMG) return null;
+  for (const arr of Object.values(BY_DATE)) {
+    for (const p of arr) {
+      if (p.path === SELECTED_IMG) return p;
+    }
+  }
+  return null;
+}
+
+function onRerollSameDay() {
+  if (!currentDate) {
+    statusLine.textContent = '请从 /review 点击某张照片进入模拟器。';
+    return;
+  }
+
+  // 直接排除当前这张来抽，不用抽到自己再重抽
+  const pick = pickPhotoWithLookback(currentDate, currentPhoto ? currentPhoto.path : null);
+  if (!pick || !pick.photo) {
+    statusLine.textContent = '该日期及向前 ' + MAX_LOOKBACK + ' 天内没有可用照片。';
+    return;
+  }
+
+  currentPhoto = pick.photo;
+  updateMeta(currentPhoto);
+  drawPreview(currentPhoto);
+}
+
+document.getElementById('rerollBtn').addEventListener('click', onRerollSameDay);
+
+// 默认进入：如果从 review 点进来，则显示该照片；否则提示用户从 review 进入
+const initPhoto = findSelectedPhoto();
+if (!initPhoto) {
+  updateMeta(null);
+  drawPreview(null);
+} else {
+  currentDate = initPhoto.date;
+  currentPhoto = initPhoto;
+  updateMeta(currentPhoto);
+  drawPreview(currentPhoto);
+}